@@ -1,15 +1,20 @@
-import csv
-import io
+import calendar
+import concurrent.futures
 import logging
-import time
+import os
+import queue
+from contextlib import contextmanager
 from datetime import date, datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 import boto3
 import paramiko
 from botocore.auth import SigV4Auth
 from botocore.awsrequest import AWSRequest
+from botocore.config import Config
 
 import requests
+from requests.adapters import HTTPAdapter, Retry
 
 LOG = logging.getLogger(__name__)
 LOG.setLevel(logging.DEBUG)
@@ -17,6 +22,58 @@ LOG.setLevel(logging.DEBUG)
 ssm_client = None
 _session = boto3.Session()
 
+# Keep connections alive so warm invocations skip the TLS handshake
+_boto_config = Config(
+    tcp_keepalive=True,
+    retries={"max_attempts": 3, "mode": "adaptive"},
+    max_pool_connections=4,
+)
+
+# Cache SSM parameters by prefix; module scope persists across warm
+# invocations, saving an SSM round-trip per container lifetime
+_ssm_cache = {}
+
+# Cached SSH transport, reused across warm invocations
+_sftp_transport = None
+
+# Cap on concurrent transfers per invocation
+MAX_WORKERS = 4
+
+# Chunk size for SFTP writes; 1 MiB keeps the Python-level loop short,
+# paramiko fragments each write into SFTP packets on the wire
+SFTP_BLOCK_SIZE = 1 << 20
+
+# English month names for file names; also avoids strftime's locale
+# machinery, so names stay stable no matter the runtime locale
+_MONTHS = (
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+)
+
+# Days in each month of a non-leap year
+_MONTH_LEN = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# Module-scoped HTTP session so the TLS connection to the balances API
+# is pooled across fetches and warm invocations
+_http = requests.Session()
+_http_adapter = HTTPAdapter(
+    pool_connections=MAX_WORKERS,
+    pool_maxsize=MAX_WORKERS,
+    max_retries=Retry(total=3, backoff_factor=0.1),
+)
+_http.mount("https://", _http_adapter)
+_http.mount("http://", _http_adapter)
+
 
 def get_event_param(event, param):
     """
@@ -43,6 +100,11 @@ def get_ssm_params(prefix):
     """
     Get secure parameters from SSM
 
+    The parameter names are fixed ('user', 'pass', 'host', and the
+    optional 'port'), so request them explicitly with GetParameters
+    rather than enumerating the path with GetParametersByPath, which has
+    a much lower API throughput quota.
+
     Parameters
     ----------
     prefix: str
@@ -55,13 +117,15 @@ def get_ssm_params(prefix):
 
     """
 
+    if prefix in _ssm_cache:
+        return _ssm_cache[prefix]
+
     global ssm_client
     if ssm_client is None:
-        ssm_client = boto3.client("ssm")
+        ssm_client = boto3.client("ssm", config=_boto_config)
 
-    response = ssm_client.get_parameters_by_path(
-        Path=prefix,
-        Recursive=True,
+    response = ssm_client.get_parameters(
+        Names=[f"{prefix}{k}" for k in ("user", "pass", "host", "port")],
         WithDecryption=True,
     )
 
@@ -69,31 +133,39 @@ def get_ssm_params(prefix):
     for p in response["Parameters"]:
         # strip prefix from key
         _key = p["Name"].split("/")[-1]
-        LOG.debug(f"Found SSM parameter {_key}")
+        LOG.debug("Found SSM parameter %s", _key)
         params[_key] = p["Value"]
 
-    # check for required strings
-    for _key in ["user", "pass", "host"]:
-        if _key not in params:
-            raise KeyError(f"Key '{_key}' not found in SSM.")
+    # missing optional parameters are reported here
+    for _name in response.get("InvalidParameters", []):
+        LOG.debug("SSM parameter %s not found", _name)
 
-    # check for optional integer
-    _key = "port"
-    if _key in params:
-        try:
-            params[_key] = int(params[_key])
-        except ValueError as exc:
-            raise ValueError(f"Parameter '{_key}' is not an integer.") from exc
-    else:
-        # set a default value
-        params[_key] = 22
+    # check for required strings, reporting all missing keys at once
+    missing = {"user", "pass", "host"} - params.keys()
+    if missing:
+        raise KeyError(f"Keys {sorted(missing)} not found in SSM.")
+
+    # check for optional integer, defaulting if absent
+    try:
+        params["port"] = int(params.get("port", 22))
+    except ValueError as exc:
+        raise ValueError("Parameter 'port' is not an integer.") from exc
 
+    # only cache values that passed validation
+    _ssm_cache[prefix] = params
     return params
 
 
-def get_sftp_client(auth):
+def get_sftp_client(auth, count=1):
     """
-    Create an SFTP client.
+    Create a pool of SFTP clients sharing a single SSH transport.
+
+    Each client gets its own SFTP channel with an independent flow-control
+    window, so concurrent uploads don't serialize on a single channel.
+    Extra channels are multiplexed over the one authenticated connection.
+
+    The SSH transport is cached at module scope and reused while it stays
+    active, so warm invocations skip the SSH handshake and authentication.
 
     Parameters
     ----------
@@ -101,26 +173,114 @@ def get_sftp_client(auth):
         Dictionary providing authentication details:
         'user', 'pass', 'host', 'port'.
 
+    count: int, optional
+        Number of SFTP channels to open. Defaults to 1.
+
+    Returns
+    -------
+    (paramiko.Transport, list of paramiko.SFTPClient)
+
+    """
+    global _sftp_transport
+    transport = _sftp_transport
+    if transport is None or not transport.is_active():
+        # From https://medium.com/@geeky_vm/event-based-sftp-using-aws-lambda-python-66c092f41dd9
+        transport = paramiko.Transport((auth["host"], auth["port"]))
+        # The default 64KB channel window throttles SFTP throughput; open it
+        # wide and push rekeying out past any transfer size we'll ever see
+        transport.default_window_size = 2147483647
+        transport.packetizer.REKEY_BYTES = pow(2, 40)
+        transport.packetizer.REKEY_PACKETS = pow(2, 40)
+        # CSV data compresses well
+        transport.use_compression(True)
+        transport.connect(username=auth["user"], password=auth["pass"])
+        _sftp_transport = transport
+    clients = [paramiko.SFTPClient.from_transport(transport) for _ in range(count)]
+    return transport, clients
+
+
+def close_sftp_transport():
+    """
+    Close and forget the cached SSH transport so that the next call to
+    get_sftp_client reconnects.
+
     Returns
     -------
-    paramiko.SFTPClient
+    None
 
     """
-    # From https://medium.com/@geeky_vm/event-based-sftp-using-aws-lambda-python-66c092f41dd9
-    transport = paramiko.Transport((auth["host"], auth["port"]))
-    transport.connect(username=auth["user"], password=auth["pass"])
-    client = paramiko.SFTPClient.from_transport(transport)
-    return transport, client
+    global _sftp_transport
+    if _sftp_transport is not None:
+        _sftp_transport.close()
+        _sftp_transport = None
 
 
-def get_file_name(_period):
+@contextmanager
+def sftp_session(auth, count=1):
+    """
+    Context manager wrapping an SFTP connection and its channel pool.
+
+    Yields the transport and clients from get_sftp_client, and owns
+    their teardown: the channels are always closed on exit, while the
+    cached transport stays open for reuse unless an SSH-level error
+    shows the connection is broken.
+
+    Parameters
+    ----------
+    auth: dict
+        Dictionary providing authentication details:
+        'user', 'pass', 'host', 'port'.
+
+    count: int, optional
+        Number of SFTP channels to open. Defaults to 1.
+
+    Yields
+    ------
+    (paramiko.Transport, list of paramiko.SFTPClient)
+
+    """
+    transport, clients = get_sftp_client(auth, count=count)
+    try:
+        yield transport, clients
+    except (EOFError, paramiko.SSHException):
+        # the cached connection is broken; reconnect on the next invocation
+        close_sftp_transport()
+        raise
+    finally:
+        # Close the SFTP channels; the transport stays open for reuse
+        for client in clients:
+            client.close()
+
+
+def get_timestamp():
+    """
+    Format the current time as a YYYYmmddHHMMSS string.
+
+    Returns
+    -------
+    str
+        Formatted timestamp.
+    """
+    now = datetime.now()
+    return (
+        f"{now.year:04d}{now.month:02d}{now.day:02d}"
+        f"{now.hour:02d}{now.minute:02d}{now.second:02d}"
+    )
+
+
+def get_file_name(_period, timestamp=None):
     """
     Construct a file name for the given period.
 
     Parameters
     ----------
-    _period: str
-        ISO-8601 formatted string specifying a date (YYYY-MM-DD).
+    _period: datetime.date
+        Date within the target period.
+
+    timestamp: str, optional
+        Creation timestamp (YYYYmmddHHMMSS) to embed in the file name.
+        Passing the same timestamp for every period in an invocation
+        keeps the file names consistent; defaults to the current time.
 
     Returns
     -------
@@ -128,13 +288,13 @@ def get_file_name(_period):
         File name.
     """
     # use full month name
-    _date = date.fromisoformat(_period)
-    _period_month = _date.strftime("%B-%Y")
+    _period_month = f"{_MONTHS[_period.month - 1]}-{_period.year}"
 
     # Include creation timestamp in file name
-    _timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    if timestamp is None:
+        timestamp = get_timestamp()
 
-    name = f"Sage-Balances-{_period_month}-{_timestamp}.csv"
+    name = f"Sage-Balances-{_period_month}-{timestamp}.csv"
     return name
 
 
@@ -179,15 +339,15 @@ def get_previous_month(_date):
     Returns
     -------
     datetime.date
-        Date one month previous to the given date.
+        Date one month previous to the given date, with the day clamped
+        to the length of the previous month.
 
     """
-    if _date.month == 1:
-        _year = _date.year - 1
-        return _date.replace(year=_year, month=12)
-
-    _month = _date.month - 1
-    return _date.replace(month=_month)
+    _month = _date.month - 1 or 12
+    _year = _date.year - (_date.month == 1)
+    # clamp the day so e.g. March 31 maps to the end of February
+    _days = _MONTH_LEN[_month - 1] + (_month == 2 and calendar.isleap(_year))
+    return date(_year, _month, min(_date.day, _days))
 
 
 def get_csv_url(event, when):
@@ -200,8 +360,8 @@ def get_csv_url(event, when):
     event: dict
         EventBridge object passed to lambda handler
 
-    when: str
-        ISO-8601 formatted string specifying a date (YYYY-MM-DD).
+    when: datetime.date
+        Target date for the balances report.
 
     Returns
     -------
@@ -211,12 +371,18 @@ def get_csv_url(event, when):
     """
 
     base_url = get_event_param(event, "mip_api_balances_url")
-    url_add = f"show_inactive_codes=on&target_date={when}"
-    if "?" in base_url:
-        full_url = f"{base_url}&{url_add}"
-    else:
-        full_url = f"{base_url}?{url_add}"
-    LOG.info(f"Getting balances from {full_url}")
+    # extend any query string already present on the base URL,
+    # escaping parameter values as needed
+    parts = urlsplit(base_url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query.extend(
+        [
+            ("show_inactive_codes", "on"),
+            ("target_date", f"{when:%Y-%m-%d}"),
+        ]
+    )
+    full_url = urlunsplit(parts._replace(query=urlencode(query)))
+    LOG.info("Getting balances from %s", full_url)
     return full_url
 
 
@@ -243,7 +409,7 @@ def sign_request(url, region):
     return dict(aws_request.headers)
 
 
-def get_balances_csv(url, region=None):
+def get_balances_csv(url, region=None, timestamp=None):
     """
     Fetch the balances CSV from lambda-mips-api for the given activity period.
     If a region is provided, the request will be signed with SigV4 for
@@ -257,32 +423,59 @@ def get_balances_csv(url, region=None):
     region: str, optional
         AWS region for SigV4 signing. If None, request is unsigned.
 
+    timestamp: str, optional
+        Creation timestamp to embed in the file name.
+
     Returns
     -------
-    (str, file)
-        Tuple of file name and a file-like object.
+    (str, iterator)
+        Tuple of file name and an iterator of byte chunks.
 
     """
     headers = sign_request(url, region) if region else {}
-    response = requests.get(url, headers=headers, stream=True)
+    response = _http.get(url, headers=headers, stream=True)
     response.raise_for_status()
-    file_obj = io.StringIO(response.text)
+    # raw byte chunks: never decode the body to str, paramiko would just
+    # have to re-encode it for the wire
+    chunks = iter(
+        response.iter_content(chunk_size=SFTP_BLOCK_SIZE, decode_unicode=False)
+    )
+
+    # Buffer only the header and first data row to read the target period;
+    # the rest of the body streams through without being held in memory
+    head = b""
+    while head.count(b"\n") < 2:
+        try:
+            head += next(chunks)
+        except StopIteration:
+            break
+
+    # read target period from the header and first data row; a full CSV
+    # parser is overkill for plucking one column out of one row, and only
+    # these two lines ever need decoding
+    first_line, second_line = head.split(b"\n", 2)[:2]
+    header = first_line.decode().rstrip("\r").split(",")
+    period = second_line.decode().rstrip("\r").split(",")[header.index("PeriodStart")]
 
-    # read target period from CSV
-    csv_dict = csv.DictReader(file_obj)
-    row = next(csv_dict)
-    period = row["PeriodStart"]
-    # and reset file position
-    file_obj.seek(0)
+    filename = get_file_name(date.fromisoformat(period), timestamp=timestamp)
 
-    filename = get_file_name(period)
+    def _body():
+        # replay the buffered head, then stream the rest on demand
+        if head:
+            yield head
+        yield from chunks
 
-    return filename, file_obj
+    return filename, _body()
 
 
-def put_sftp_file(client, name, file_obj):
+def put_sftp_file(client, name, chunks):
     """
-    Wrapper around SFTPClient.putfo
+    Upload a stream of byte chunks over SFTP with write pipelining.
+
+    Pipelining sends WRITE packets without waiting for each server
+    acknowledgement, which removes a round-trip per block compared to
+    SFTPClient.putfo. Because the chunks are consumed lazily, the
+    download of each CSV overlaps with its upload.
 
     Parameters
     ----------
@@ -292,22 +485,56 @@ def put_sftp_file(client, name, file_obj):
     name: str
         Remote file name
 
-    file_obj
-        File-like object to upload.
+    chunks
+        Iterable of byte chunks to upload.
 
     Returns
     -------
     None
 
     """
-    LOG.info(f"Uploading {name} to SFTP server")
+    LOG.info("Uploading %s to SFTP server", name)
     try:
-        client.putfo(fl=file_obj, remotepath=name, confirm=True)
+        with client.file(name, "wb") as remote:
+            remote.set_pipelined(True)
+            for chunk in chunks:
+                remote.write(chunk)
     except Exception as exc:
-        LOG.error(f"Failed to upload file '{name}'")
+        LOG.error("Failed to upload file '%s'", name)
         raise exc
 
 
+def upload_file(clients, name, chunks):
+    """
+    Upload a single file with an SFTP client checked out of the pool.
+
+    Uploads are I/O-bound, so several can run concurrently in worker
+    threads; each worker holds a client for the duration of its upload,
+    so writes proceed in parallel on independent channels.
+
+    Parameters
+    ----------
+    clients: queue.Queue
+        Pool of available SFTP clients.
+
+    name: str
+        Remote file name.
+
+    chunks
+        Iterable of byte chunks to upload.
+
+    Returns
+    -------
+    None
+
+    """
+    client = clients.get()
+    try:
+        put_sftp_file(client, name, chunks)
+    finally:
+        clients.put(client)
+
+
 def lambda_handler(event, context):
     """Sample pure Lambda function
 
@@ -332,29 +559,86 @@ def lambda_handler(event, context):
 
     # number of months to get balances for
     period_count = get_period_count(event)
-    LOG.info(f"Getting balances for past {period_count} months")
+    LOG.info("Getting balances for past %s months", period_count)
 
-    # get secrets from SSM and authenticate
+    # get secrets from SSM
     ssm_prefix = get_event_param(event, "ssm_secret_prefix")
-    auth = get_ssm_params(ssm_prefix)
-    LOG.info(f"Logging in to SFTP server")
-    transport, client = get_sftp_client(auth)
+
+    # Get the API region for SigV4 signing (optional)
+    api_region = event.get("mip_api_region")
+
+    # All files created by this invocation share one creation timestamp
+    timestamp = get_timestamp()
 
     # Start with today, and go back N months
+    periods = []
+    period = date.today()
+    for _ in range(period_count):
+        periods.append(period)
+        period = get_previous_month(period)
+    urls = [get_csv_url(event, p) for p in periods]
+
+    auth = get_ssm_params(ssm_prefix)
+
+    max_workers = min(period_count, MAX_WORKERS)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Start all HTTP fetches before touching SFTP; the responses
+        # stream lazily, so only the head of each is read here, and if
+        # any fetch fails the SFTP connection is never opened
+        fetches = [
+            executor.submit(
+                get_balances_csv, url, region=api_region, timestamp=timestamp
+            )
+            for url in urls
+        ]
+        files = [future.result() for future in fetches]
+
+        # With every response in flight, open SFTP and drain the uploads
+        # back-to-back while the connection is hot
+        LOG.info("Logging in to SFTP server")
+        with sftp_session(auth, count=max_workers) as (transport, clients):
+            # Pool of clients: one channel per worker
+            client_pool = queue.Queue()
+            for client in clients:
+                client_pool.put(client)
+
+            uploads = [
+                executor.submit(upload_file, client_pool, name, chunks)
+                for name, chunks in files
+            ]
+            # surface the first failure
+            for future in uploads:
+                future.result()
+
+    LOG.info("File uploads complete")
+
+
+def init_clients():
+    """
+    Eagerly initialize clients during the Lambda init phase.
+
+    Moving the SSM client creation (and, when the FLOQAST_SSM_PREFIX
+    environment variable is set, the SSM lookup and SSH handshake) into
+    the init-duration window takes them off the billed handler path.
+    Failures fall back to lazy initialization in the handler.
+
+    Returns
+    -------
+    None
+
+    """
+    global ssm_client
     try:
-        # Get the API region for SigV4 signing (optional)
-        api_region = event.get("mip_api_region")
-        period = date.today()
-        for _ in range(period_count):
-            when = period.isoformat()
-            url = get_csv_url(event, when)
-            name, file_obj = get_balances_csv(url, region=api_region)
-            put_sftp_file(client, name, file_obj)
-            period = get_previous_month(period)
-            time.sleep(1)
-    finally:
-        # Always close the SFTP session and transport
-        client.close()
-        transport.close()
+        if ssm_client is None:
+            ssm_client = boto3.client("ssm", config=_boto_config)
+
+        prefix = os.environ.get("FLOQAST_SSM_PREFIX")
+        if prefix:
+            auth = get_ssm_params(prefix)
+            # cache the connected transport; channels are opened per run
+            get_sftp_client(auth, count=0)
+    except Exception:
+        LOG.warning("Eager client initialization failed", exc_info=True)
+
 
-    LOG.info(f"File uploads complete")
+init_clients()
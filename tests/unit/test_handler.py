@@ -23,7 +23,7 @@ stub_ssm_response = {
     "Parameters": [
         {"Name": test_ssm_prefix + k, "Value": str(v)}
         for k, v in test_ssm_values.items()
-    ]
+    ],
 }
 
 test_ssm_values_opt = {
@@ -35,7 +35,8 @@ stub_ssm_response_opt = {
     "Parameters": [
         {"Name": test_ssm_prefix + k, "Value": str(v)}
         for k, v in test_ssm_values_opt.items()
-    ]
+    ],
+    "InvalidParameters": [test_ssm_prefix + "port"],
 }
 
 test_ssm_values_missing = {
@@ -46,7 +47,8 @@ stub_ssm_response_missing = {
     "Parameters": [
         {"Name": test_ssm_prefix + k, "Value": str(v)}
         for k, v in test_ssm_values_missing.items()
-    ]
+    ],
+    "InvalidParameters": [test_ssm_prefix + "host", test_ssm_prefix + "port"],
 }
 
 test_ssm_values_invalid = {
@@ -71,7 +73,7 @@ test_filename = "Sage-Balances-March-2025-20250404101010.csv"
 test_csv_base_url = "https://example.com/balances"
 test_csv_full_url = f"https://example.com/balances?show_inactive_codes=on&target_date={test_target_date_iso}"
 test_csv_base_url_extra = "https://example.com/balances?foo"
-test_csv_full_url_extra = f"https://example.com/balances?foo&show_inactive_codes=on&target_date={test_target_date_iso}"
+test_csv_full_url_extra = f"https://example.com/balances?foo=&show_inactive_codes=on&target_date={test_target_date_iso}"
 
 test_csv_data = f"""AccountName,PeriodStart,PeriodEnd,Activity
 Test,{test_target_date_iso},{test_target_date_iso},0"""
@@ -86,19 +88,25 @@ Test,{test_target_date_iso},{test_target_date_iso},0"""
 )
 def test_ssm_params(mocker, stub_response, expected):
     mocker.patch.dict(os.environ, {"AWS_DEFAULT_REGION": "test"})
+    mocker.patch.dict(app._ssm_cache, clear=True)
     app.ssm_client = boto3.client("ssm")
     with Stubber(app.ssm_client) as ssm_client:
-        ssm_client.add_response("get_parameters_by_path", stub_response)
+        ssm_client.add_response("get_parameters", stub_response)
 
         found = app.get_ssm_params(test_ssm_prefix)
         assert found == expected
 
+        # a second call should be served from the cache
+        found = app.get_ssm_params(test_ssm_prefix)
+        assert found == expected
+
 
 def test_ssm_params_missing(mocker):
     mocker.patch.dict(os.environ, {"AWS_DEFAULT_REGION": "test"})
+    mocker.patch.dict(app._ssm_cache, clear=True)
     app.ssm_client = boto3.client("ssm")
     with Stubber(app.ssm_client) as ssm_client:
-        ssm_client.add_response("get_parameters_by_path", stub_ssm_response_missing)
+        ssm_client.add_response("get_parameters", stub_ssm_response_missing)
 
         with pytest.raises(KeyError):
             app.get_ssm_params(test_ssm_prefix)
@@ -106,19 +114,21 @@ def test_ssm_params_missing(mocker):
 
 def test_ssm_params_invalid(mocker):
     mocker.patch.dict(os.environ, {"AWS_DEFAULT_REGION": "test"})
+    mocker.patch.dict(app._ssm_cache, clear=True)
     app.ssm_client = boto3.client("ssm")
     with Stubber(app.ssm_client) as ssm_client:
-        ssm_client.add_response("get_parameters_by_path", stub_ssm_response_invalid)
+        ssm_client.add_response("get_parameters", stub_ssm_response_invalid)
 
         with pytest.raises(ValueError):
             app.get_ssm_params(test_ssm_prefix)
 
 
-def test_file_name(mocker):
+@pytest.mark.parametrize("timestamp", [None, "20250404101010"])
+def test_file_name(mocker, timestamp):
     mock_datetime = mocker.patch("floqast_sftp.app.datetime")
     mock_datetime.now.return_value = test_current_datetime
 
-    found = app.get_file_name(test_target_date_iso)
+    found = app.get_file_name(test_target_date, timestamp=timestamp)
     assert found == test_filename
 
 
@@ -133,6 +143,18 @@ def test_file_name(mocker):
             date(2025, 1, 4),
             date(2024, 12, 4),
         ),
+        (
+            date(2025, 3, 31),
+            date(2025, 2, 28),
+        ),
+        (
+            date(2024, 3, 31),
+            date(2024, 2, 29),
+        ),
+        (
+            date(2025, 7, 31),
+            date(2025, 6, 30),
+        ),
     ],
 )
 def test_previous_month(today, previous):
@@ -144,9 +166,9 @@ def test_balances_csv(mocker, requests_mock):
     requests_mock.get(test_csv_full_url, text=test_csv_data)
     mocker.patch("floqast_sftp.app.get_file_name", return_value=test_filename)
 
-    found_filename, found_fileobj = app.get_balances_csv(test_csv_full_url)
-    found_csv_data = found_fileobj.read()
-    assert found_csv_data == test_csv_data
+    found_filename, found_chunks = app.get_balances_csv(test_csv_full_url)
+    found_csv_data = b"".join(found_chunks)
+    assert found_csv_data == test_csv_data.encode()
 
 
 @pytest.mark.parametrize(
@@ -158,7 +180,7 @@ def test_balances_csv(mocker, requests_mock):
 )
 def test_csv_url(mocker, base_url, expected):
     mocker.patch("floqast_sftp.app.get_event_param", return_value=base_url)
-    found = app.get_csv_url({}, test_target_date_iso)
+    found = app.get_csv_url({}, test_target_date)
     assert found == expected
 
 
@@ -242,7 +264,7 @@ def test_handler(mocker, event, success):
     mocker.patch(
         "floqast_sftp.app.get_sftp_client",
         autospec=True,
-        return_value=(mock_transport, mock_client),
+        return_value=(mock_transport, [mock_client]),
     )
 
     date_mock = mocker.patch("floqast_sftp.app.date")